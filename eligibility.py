@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from models import Donor, Donation, DonationType
+
+# Age limits are inclusive at both ends: eligible from the 18th birthday
+# through the day before the 66th birthday (i.e. while aged 18 to 65)
+MIN_DONOR_AGE = 18
+MAX_DONOR_AGE = 65
+
+# Days a donor must wait after giving each product before donating again
+DONATION_COOLDOWN_DAYS = {
+    DonationType.WHOLE_BLOOD: 90,
+    DonationType.PACKED_CELLS: 112,
+    DonationType.FFP: 28,
+    DonationType.PLASMA: 28,
+    DonationType.PLATELETS: 7,
+}
+
+# Brings databases created before donations existed up to date; safe to run on every startup
+MIGRATION_SQL = [
+    "ALTER TABLE donors ADD COLUMN IF NOT EXISTS next_eligible_on DATE",
+    "CREATE INDEX IF NOT EXISTS ix_donors_blood_type_next_eligible_on ON donors (blood_type, next_eligible_on)",
+]
+
+def add_years(d: date, years: int) -> date:
+    """Shift a date by whole years, mapping Feb 29 to Feb 28 in non-leap years"""
+    try:
+        return d.replace(year=d.year + years)
+    except ValueError:
+        return d.replace(year=d.year + years, day=28)
+
+def compute_next_eligible_on(dob: date, donated_on: Optional[date] = None, donation_type: Optional[DonationType] = None) -> date:
+    """Earliest date a donor may give, ignoring the upper age limit (the eligible-donors query checks dob for that)"""
+    next_eligible = add_years(dob, MIN_DONOR_AGE)
+    if donated_on and donation_type:
+        next_eligible = max(next_eligible, donated_on + timedelta(days=DONATION_COOLDOWN_DAYS[donation_type]))
+    return next_eligible
+
+def oldest_eligible_dob_cutoff(today: date) -> date:
+    """Donors must be born after this date to still be within MAX_DONOR_AGE today"""
+    return add_years(today, -(MAX_DONOR_AGE + 1))
+
+def recompute_next_eligible_on(db: Session, donor: Donor) -> date:
+    """Next eligible date from the donor's dob and full donation history"""
+    next_eligible = compute_next_eligible_on(donor.dob)
+    for donated_on, donation_type in db.query(Donation.donated_on, Donation.donation_type).filter(Donation.donor_id == donor.id).all():
+        next_eligible = max(next_eligible, compute_next_eligible_on(donor.dob, donated_on, donation_type))
+    return next_eligible
+
+def migrate_donor_eligibility(db: Session):
+    """Add the next_eligible_on column/index if missing and fill it in for donors that don't have it yet"""
+    for statement in MIGRATION_SQL:
+        db.execute(text(statement))
+    db.commit()
+
+    for donor in db.query(Donor).filter(Donor.next_eligible_on.is_(None)).all():
+        donor.next_eligible_on = recompute_next_eligible_on(db, donor)
+    db.commit()
@@ -1,21 +1,23 @@
 from fastapi import FastAPI, Depends, HTTPException, status, Form, Body, Request
 from sqlalchemy.orm import Session
+from sqlalchemy import text
 from fastapi.responses import JSONResponse
-from database import engine, SessionLocal, Base
-from models import User, Donor, Receiver, EmergencyContact, BloodType, Gender
+from database import engine, SessionLocal, DB_MAX_OVERFLOW, init_db
+from models import User, Donor, Receiver, EmergencyContact, Donation, BloodType, Gender, DonationType
+from eligibility import compute_next_eligible_on, recompute_next_eligible_on, oldest_eligible_dob_cutoff
 from schema import UserCreate, UserLogin, UserResponse, EmergencyContactCreate, DonorCreate, ReceiverCreate, DonorFormData, ReceiverFormData
-from passlib.context import CryptContext
+from security import pwd_context
 from typing import List, Dict, Any, Optional
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import date
 from pydantic import EmailStr
+import os
 
 app = FastAPI()
 
-# Create all tables in the database
-Base.metadata.create_all(bind=engine)
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Create all tables in the database (skipped in workers when server.py has already done it)
+if os.getenv("DB_CREATE_ALL", "1") == "1":
+    init_db()
 
 # CORS middleware configuration
 app.add_middleware(
@@ -34,6 +36,37 @@ def get_db():
     finally:
         db.close()
 
+# Liveness check - process is up and serving requests
+@app.get("/health")
+def health():
+    return {"status": "ok", "pid": os.getpid()}
+
+# Readiness check - database reachable and pool not exhausted
+@app.get("/ready")
+def ready():
+    pool = engine.pool
+    pool_state = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+    # Don't wait on pool_timeout if every connection is already in use
+    if pool.checkedout() >= pool.size() + DB_MAX_OVERFLOW:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "pool exhausted", "pool": pool_state, "pid": os.getpid()}
+        )
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unavailable", "detail": str(e), "pool": pool_state, "pid": os.getpid()}
+        )
+    return {"status": "ready", "pool": pool_state, "pid": os.getpid()}
+
 # Check if User Exists (Used in Register & Login)
 @app.get("/user_exists")
 def user_exists(email: str, db: Session = Depends(get_db)):
@@ -49,8 +82,9 @@ def user_by_email(email: str, db: Session = Depends(get_db)):
     return {"id": user.id, "name": user.name, "email": user.email}
 
 # Register User - Modified to accept direct JSON data
+# Plain def so FastAPI runs it in the threadpool; password hashing would otherwise block the event loop
 @app.post("/register", status_code=status.HTTP_201_CREATED)
-async def register(data: Dict[str, Any] = Body(...), db: Session = Depends(get_db)):
+def register(data: Dict[str, Any] = Body(...), db: Session = Depends(get_db)):
     # Extract data from request body
     name = data.get("name")
     email = data.get("email")
@@ -87,8 +121,9 @@ async def register(data: Dict[str, Any] = Body(...), db: Session = Depends(get_d
     }
 
 # Login User - Modified to accept direct JSON data
+# Plain def for the same reason as register: verify/rehash runs in the threadpool
 @app.post("/login")
-async def login(data: Dict[str, Any] = Body(...), db: Session = Depends(get_db)):
+def login(data: Dict[str, Any] = Body(...), db: Session = Depends(get_db)):
     # Extract data from request body
     email = data.get("email")
     password = data.get("password")
@@ -101,11 +136,25 @@ async def login(data: Dict[str, Any] = Body(...), db: Session = Depends(get_db))
     db_user = db.query(User).filter(User.email == email).first()
     
     # Verify user exists and password is correct
-    if not db_user or not pwd_context.verify(password, db_user.password):
+    if not db_user:
+        # Spend the same hashing time as a real check so missing emails can't be told apart
+        pwd_context.dummy_verify()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, 
             detail="Invalid credentials"
         )
+    
+    valid, new_hash = pwd_context.verify_and_update(password, db_user.password)
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, 
+            detail="Invalid credentials"
+        )
+    
+    # Rehash with the current scheme/cost if the stored hash is outdated
+    if new_hash:
+        db_user.password = new_hash
+        db.commit()
 
     # Check if user is a donor or receiver
     is_donor = db.query(Donor).filter(Donor.id == db_user.id).first() is not None
@@ -173,7 +222,8 @@ async def submit_donor_form(form_data: Dict[str, Any] = Body(...), db: Session =
             blood_type=blood_type,
             dob=dob,
             gender=gender,
-            phone=phone
+            phone=phone,
+            next_eligible_on=compute_next_eligible_on(dob)
         )
         
         db.add(donor)
@@ -355,7 +405,8 @@ def get_profile(user_id: int, db: Session = Depends(get_db)):
             "gender": donor.dob.isoformat() if donor and donor.dob else None,
             "age": age,
             "gender": gender_str,
-            "phone": donor.phone if donor else (receiver.phone if receiver else None)
+            "phone": donor.phone if donor else (receiver.phone if receiver else None),
+            "next_eligible_on": donor.next_eligible_on.isoformat() if donor and donor.next_eligible_on else None
         },
         "emergency_contacts": [
             {
@@ -394,7 +445,8 @@ def dashboard(user_id: int, db: Session = Depends(get_db)):
             "blood_type": donor.blood_type.value if donor else None,
             "dob": donor.dob.isoformat() if donor else None,
             "gender": donor.gender if donor else None,
-            "phone": donor.phone if donor else None
+            "phone": donor.phone if donor else None,
+            "next_eligible_on": donor.next_eligible_on.isoformat() if donor and donor.next_eligible_on else None
         } if donor else None,
         "receiver_profile": {
             "required_blood_type": receiver.required_blood_type.value if receiver else None,
@@ -456,6 +508,86 @@ def add_emergency_contacts(
     
     return {"message": "Emergency contacts added successfully"}
 
+# Record a Donation
+@app.post("/record-donation/{user_id}", status_code=status.HTTP_201_CREATED)
+def record_donation(user_id: int, data: Dict[str, Any] = Body(...), db: Session = Depends(get_db)):
+    # Lock the donor row so concurrent donations can't overwrite each other's next_eligible_on
+    donor = db.query(Donor).filter(Donor.id == user_id).with_for_update().first()
+    if not donor:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Donor not found")
+    
+    try:
+        donation_type = DonationType(data.get("donationType", DonationType.WHOLE_BLOOD.value))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid donation type")
+    
+    donated_on_str = data.get("donatedOn")
+    try:
+        donated_on = date.fromisoformat(donated_on_str) if donated_on_str else date.today()
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid donation date")
+    if donated_on > date.today():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Donation date cannot be in the future")
+    if donated_on < donor.dob:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Donation date cannot be before date of birth")
+    
+    if donor.next_eligible_on is None:
+        # Not computed yet (donor predates the column), so build it from the full history first
+        donor.next_eligible_on = recompute_next_eligible_on(db, donor)
+    
+    donation = Donation(donor_id=donor.id, donated_on=donated_on, donation_type=donation_type)
+    db.add(donation)
+    
+    # Incremental update: eligibility is the latest of all cooldown ends, so only
+    # this donation needs to be compared against the stored value
+    candidate = compute_next_eligible_on(donor.dob, donated_on, donation_type)
+    donor.next_eligible_on = max(donor.next_eligible_on, candidate)
+    
+    db.commit()
+    db.refresh(donation)
+    
+    return {
+        "id": donation.id,
+        "donated_on": donation.donated_on.isoformat(),
+        "donation_type": donation.donation_type.value,
+        "next_eligible_on": donor.next_eligible_on.isoformat()
+    }
+
+# Donors of a Blood Type who can donate today
+@app.get("/eligible-donors")
+def eligible_donors(blood_type: str, db: Session = Depends(get_db)):
+    # Don't use map_blood_group_to_enum here: it falls back to O+ on bad input
+    try:
+        blood_type_enum = BloodType(blood_type.upper().strip())
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid blood type. Must be one of: {', '.join(b.value for b in BloodType)} (URL-encode '+' as %2B)"
+        )
+    
+    today = date.today()
+    donors = (
+        db.query(Donor, User.name)
+        .join(User, User.id == Donor.id)
+        .filter(
+            Donor.blood_type == blood_type_enum,
+            Donor.next_eligible_on <= today,
+            # Donors age out without any write, so drop anyone past the upper age limit
+            Donor.dob > oldest_eligible_dob_cutoff(today)
+        )
+        .order_by(Donor.next_eligible_on)
+        .all()
+    )
+    return [
+        {
+            "id": donor.id,
+            "name": name,
+            "phone": donor.phone,
+            "blood_type": donor.blood_type.value,
+            "next_eligible_on": donor.next_eligible_on.isoformat()
+        } for donor, name in donors
+    ]
+
 # Helper functions
 def map_blood_group_to_enum(blood_group: str) -> BloodType:
     """Map blood group string to BloodType enum"""
@@ -485,6 +617,7 @@ def map_blood_unit_to_blood_type(blood_unit: str) -> BloodType:
     return mapping.get(blood_unit, BloodType.O_POSITIVE)  # Default to O+ if not found
 
 if __name__ == "__main__":
+    # Single-process development server; use server.py in production
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
 
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Date
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Date, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -20,6 +20,14 @@ class Gender(enum.Enum):
     FEMALE = 2
     OTHER = 3
 
+# Enum for Donated Blood Products (values match the recipient form's bloodUnit)
+class DonationType(enum.Enum):
+    WHOLE_BLOOD = "wholeBlood"
+    PACKED_CELLS = "packedCells"
+    FFP = "ffp"
+    PLASMA = "plasma"
+    PLATELETS = "plateletConc"
+
 # User Model (Base Class)
 class User(Base):
     __tablename__ = "users"
@@ -41,9 +49,18 @@ class Donor(Base):
     dob = Column(Date, nullable=False)
     gender = Column(Integer, nullable=False)
     phone = Column(String(10), nullable=False)
+    # Earliest date the donor may give again (minimum age + last donation cooldown).
+    # NULL only until init_db backfills it; the upper age limit is checked against dob at query time.
+    next_eligible_on = Column(Date, nullable=True)
 
     # Define relationship with User
     user = relationship("User", backref="donor_profile", uselist=False)
+    donations = relationship("Donation", back_populates="donor", cascade="all, delete-orphan")
+
+    # "Eligible donors of type X today" is a range scan on this index
+    __table_args__ = (
+        Index("ix_donors_blood_type_next_eligible_on", "blood_type", "next_eligible_on"),
+    )
 
 # Receiver Model (inherits from User)
 class Receiver(Base):
@@ -70,3 +87,18 @@ class EmergencyContact(Base):
     # Define relationship with User
     user = relationship("User", back_populates="emergency_contacts")
 
+# Donation History Model
+class Donation(Base):
+    __tablename__ = "donations"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    donor_id = Column(Integer, ForeignKey("donors.id", ondelete="CASCADE"), nullable=False)
+    donated_on = Column(Date, nullable=False)
+    donation_type = Column(Enum(DonationType), nullable=False)
+
+    # Define relationship with Donor
+    donor = relationship("Donor", back_populates="donations")
+
+    __table_args__ = (
+        Index("ix_donations_donor_id_donated_on", "donor_id", "donated_on"),
+    )
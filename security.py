@@ -0,0 +1,108 @@
+"""Password hashing settings and cost calibration.
+
+Settings (environment variables):
+    PASSWORD_SCHEME         "bcrypt" (default) or "argon2id" ("argon2" also accepted); hashes in the other scheme still verify
+    BCRYPT_ROUNDS           bcrypt log2 cost (default 12)
+    ARGON2_TIME_COST        argon2 iterations (default 3)
+    ARGON2_MEMORY_COST      argon2 memory in KiB (default 65536)
+    ARGON2_PARALLELISM      argon2 lanes (default 4)
+
+Hashes made with another scheme or different cost settings (higher or lower) are flagged
+by needs_update() and rehashed on the next successful login.
+
+Calibration:
+    python security.py --target-ms 250 [--scheme argon2id]
+prints the cost whose verify time on this machine is closest to the target without going over.
+"""
+import os
+import time
+import argparse
+from typing import Dict, Any
+from passlib.context import CryptContext
+
+PASSWORD_SCHEME = os.getenv("PASSWORD_SCHEME", "bcrypt")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+SCHEMES = ("bcrypt", "argon2")
+# Accepted PASSWORD_SCHEME spellings -> passlib scheme names (argon2 is always hashed as argon2id)
+SCHEME_ALIASES = {"bcrypt": "bcrypt", "argon2": "argon2", "argon2id": "argon2"}
+
+
+def build_context(scheme: str = PASSWORD_SCHEME, **settings) -> CryptContext:
+    """Build a CryptContext hashing with `scheme`; other schemes are kept for verification only"""
+    if scheme not in SCHEME_ALIASES:
+        raise ValueError(f"PASSWORD_SCHEME must be one of {', '.join(SCHEME_ALIASES)}")
+    scheme = SCHEME_ALIASES[scheme]
+    bcrypt_rounds = settings.get("bcrypt_rounds", BCRYPT_ROUNDS)
+    argon2_time_cost = settings.get("argon2_time_cost", ARGON2_TIME_COST)
+    argon2_memory_cost = settings.get("argon2_memory_cost", ARGON2_MEMORY_COST)
+    argon2_parallelism = settings.get("argon2_parallelism", ARGON2_PARALLELISM)
+    return CryptContext(
+        # First scheme is the default; deprecated="auto" marks the rest for rehashing
+        schemes=[scheme] + [s for s in SCHEMES if s != scheme],
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        # min/max_rounds make needs_update() flag any hash whose cost differs from the current
+        # setting, so lowering the cost for throughput also rehashes existing passwords
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__type="ID",
+        argon2__rounds=argon2_time_cost,
+        argon2__min_rounds=argon2_time_cost,
+        argon2__max_rounds=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+pwd_context = build_context()
+
+
+def time_verify(context: CryptContext, samples: int = 3) -> float:
+    """Median verify time in milliseconds for the context's default scheme"""
+    password = "calibration-password"
+    hashed = context.hash(password)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.verify(password, hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def calibrate(scheme: str, target_ms: float, samples: int = 3) -> Dict[str, Any]:
+    """Raise the cost until verify time would exceed target_ms and return the last cost that fit"""
+    if SCHEME_ALIASES[scheme] == "bcrypt":
+        setting, costs = "bcrypt_rounds", range(4, 18)
+    else:
+        # Memory is fixed by ARGON2_MEMORY_COST; time cost is the knob
+        setting, costs = "argon2_time_cost", range(1, 33)
+
+    best = None
+    for cost in costs:
+        elapsed = time_verify(build_context(scheme, **{setting: cost}), samples)
+        print(f"  {setting}={cost}: {elapsed:.1f} ms")
+        if elapsed > target_ms:
+            break
+        best = {"setting": setting, "cost": cost, "verify_ms": elapsed}
+    if best is None:
+        best = {"setting": setting, "cost": costs[0], "verify_ms": elapsed}
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick a password hashing cost for a target verify latency")
+    parser.add_argument("--scheme", choices=list(SCHEME_ALIASES), default=PASSWORD_SCHEME)
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Calibrating {args.scheme} for a {args.target_ms:.0f} ms verify on this machine")
+    result = calibrate(args.scheme, args.target_ms, args.samples)
+    print(
+        f"Recommended: PASSWORD_SCHEME={args.scheme} {result['setting'].upper()}={result['cost']} "
+        f"({result['verify_ms']:.1f} ms per verify, ~{1000 / result['verify_ms']:.1f} logins/s per core)"
+    )
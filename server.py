@@ -0,0 +1,131 @@
+"""Production launcher: runs main:app under multiple uvicorn worker processes.
+
+Usage:
+    python server.py
+
+This is the only production entry point; `python main.py` runs a single-process dev server.
+
+Settings (environment variables):
+    HOST, PORT                  bind address (default 0.0.0.0:8000)
+    WEB_CONCURRENCY             force a worker count instead of auto-sizing
+    DB_MAX_CONNECTIONS          Postgres max_connections (default 100)
+    DB_RESERVED_CONNECTIONS     connections kept free for psql, migrations, etc. (default 10)
+    PRELOAD                     "1" to import the app once in the supervisor first, so import errors fail fast
+    GRACEFUL_TIMEOUT            seconds a worker gets to finish in-flight requests on shutdown
+
+Send SIGHUP to the supervisor to re-run schema migrations and then restart workers one at a
+time (rolling reload), SIGTERM/SIGINT to drain and stop. The supervisor runs even with a
+single worker, so SIGHUP never kills the service.
+"""
+import os
+import sys
+import subprocess
+from uvicorn import Config, Server
+from uvicorn.supervisors import Multiprocess
+from database import DB_POOL_SIZE, DB_MAX_OVERFLOW
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "100"))
+DB_RESERVED_CONNECTIONS = int(os.getenv("DB_RESERVED_CONNECTIONS", "10"))
+PRELOAD = os.getenv("PRELOAD", "1") == "1"
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+
+
+def cpu_count() -> int:
+    """Number of CPUs this process may actually run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def compute_workers() -> int:
+    """Pick a worker count from CPU count, capped so workers x pool never exceeds max_connections"""
+    override = os.getenv("WEB_CONCURRENCY")
+    if override:
+        workers = int(override)
+    else:
+        # Requests are mostly CPU bound (bcrypt), so one worker per core
+        workers = cpu_count()
+
+    per_worker = DB_POOL_SIZE + DB_MAX_OVERFLOW
+    if per_worker <= 0:
+        return max(1, workers)
+    available = DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS
+    db_limit = available // per_worker
+    if db_limit < 1:
+        raise SystemExit(
+            f"Connection budget too small: DB_MAX_CONNECTIONS ({DB_MAX_CONNECTIONS}) - DB_RESERVED_CONNECTIONS "
+            f"({DB_RESERVED_CONNECTIONS}) = {available} is less than one worker's pool "
+            f"(DB_POOL_SIZE {DB_POOL_SIZE} + DB_MAX_OVERFLOW {DB_MAX_OVERFLOW} = {per_worker})"
+        )
+    if workers > db_limit:
+        print(
+            f"Reducing workers from {workers} to {db_limit} so {db_limit} x {per_worker} pool connections "
+            f"fit in {available} available connections",
+            file=sys.stderr,
+        )
+    return max(1, min(workers, db_limit))
+
+
+def prepare_schema():
+    """Create/migrate the schema once from the supervisor so the workers don't race each other doing it"""
+    # Run in a fresh interpreter so a SIGHUP after a deploy migrates with the new model code,
+    # not the modules already imported in this long-lived process
+    subprocess.run(
+        [sys.executable, "-c", "from database import init_db; init_db()"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        check=True,
+    )
+    # Workers import main; the schema already exists, so skip create_all there
+    os.environ["DB_CREATE_ALL"] = "0"
+
+
+def preload():
+    """Import the app once in the supervisor so import errors fail fast before any worker starts"""
+    import main  # noqa: F401
+    from database import engine
+
+    engine.dispose()
+
+
+class Supervisor(Multiprocess):
+    """uvicorn's Multiprocess supervisor, migrating the schema before a SIGHUP rolling restart"""
+
+    def restart_all(self):
+        try:
+            prepare_schema()
+        except Exception as e:
+            # Keep the old workers serving rather than starting new code on an unmigrated schema
+            print(f"Schema migration failed, not restarting workers: {e}", file=sys.stderr)
+            return
+        super().restart_all()
+
+
+def run():
+    workers = compute_workers()
+    prepare_schema()
+    if PRELOAD:
+        preload()
+
+    print(
+        f"Starting {workers} worker(s) on {HOST}:{PORT} "
+        f"(pool {DB_POOL_SIZE}+{DB_MAX_OVERFLOW} per worker, max_connections {DB_MAX_CONNECTIONS})"
+    )
+    config = Config(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        workers=workers,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+    )
+    # uvicorn.run() skips the supervisor for one worker, and then SIGHUP just kills the
+    # process, so always run under it
+    server = Server(config=config)
+    sock = config.bind_socket()
+    Supervisor(config, target=server.run, sockets=[sock]).run()
+
+
+if __name__ == "__main__":
+    run()